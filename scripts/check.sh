@@ -1,7 +1,7 @@
 #!/bin/bash
 set -ex
 
-yum install -y python3 python3-pip wget
+yum install -y python3 python3-pip wget libyaml-devel
 
 # 安装docker
 if [[ ! $(which docker) ]]; then
@@ -13,6 +13,7 @@ fi
 
 # clear unused resources
 echo "清理缓存..."
+docker ps -aq --filter label=conda-ecopkgs-verify | xargs -r docker rm -f
 docker image prune -f
 docker container prune -f
 docker network prune -f
@@ -25,7 +26,7 @@ rm -rf conda-ecopkgs
 git clone https://gitcode.com/openeuler/conda-ecopkgs.git
 cd conda-ecopkgs
 
-pip3 install click requests
+pip3 install click requests pyyaml
 
 sudo -E python3 scripts/update.py \
     -pr ${prid} \
@@ -1,14 +1,22 @@
 import argparse
 import click
-import json
+import collections
+import concurrent.futures
+import contextlib
+import functools
 import os
 import platform
 import requests
+import shlex
 import shutil
+import signal
 import sys
 import subprocess
+import threading
 import yaml
-from typing import List, Any, Tuple, Dict
+from requests.adapters import HTTPAdapter
+from typing import List, Tuple, Dict, Iterator
+from urllib3.util.retry import Retry
 
 DEFAULT_WORKDIR = "/tmp/ecopkgs/verify/"
 
@@ -16,99 +24,199 @@ CONDA_IMAGE_REPO = "openeuler/conda"
 CONDA_IMAGE_VERSION = "25.1.1"
 
 SUPPORTED_VERSIONS_FILE = "supported-versions.yml"
+SUPPORTED_VERSIONS_SUFFIX = f"/{SUPPORTED_VERSIONS_FILE}"
 PACKAGE_FILE = "package.yml"
 VERIFY_SCRIPT_FILE = "scripts/verify.sh"
 
+# talk to docker directly when the socket is accessible, e.g. when
+# running as root or as a member of the docker group
+DOCKER_SOCKET = "/var/run/docker.sock"
+DOCKER_CMD = (
+    ["docker"] if os.access(DOCKER_SOCKET, os.R_OK | os.W_OK)
+    else ["sudo", "docker"]
+)
+
+# serialize console output of concurrently running verify jobs
+_OUTPUT_LOCK = threading.Lock()
+
+# wall clock limit in seconds for verifying one package version
+VERIFY_TIMEOUT = 3600
+
+# extra lifetime of a verify container past the exec deadline, so a
+# timed out exec is killed by its timer before the container exits
+VERIFY_CONTAINER_GRACE = 60
+
+# printed by the aggregated verify script before each package version
+VERIFY_VERSION_MARKER = "::verify-version::"
+
+# label set on verify containers so leftovers can be found and removed
+VERIFY_CONTAINER_LABEL = "conda-ecopkgs-verify"
+
+# containers started by this process, removed by the signal handlers
+_LIVE_CONTAINERS = set()
+_LIVE_CONTAINERS_LOCK = threading.Lock()
+
+# set by the signal handlers, no verify container is started afterwards
+_STOP_VERIFY = threading.Event()
+
+# number of trailing output lines kept for a failed verify run
+VERIFY_OUTPUT_TAIL = 200
+
+# current machine arch and noarch packages can be verified on this host
+MACHINE_ARCH = platform.machine()
+VERIFY_ARCHES = {MACHINE_ARCH, "noarch"}
+
+# memory assumed per verify container when sizing the worker pool
+VERIFY_JOB_MEMORY = 2 * 1024 ** 3
+
 UPDATE_CODE_DIR = "update"
 ORIGIN_CODE_DIR = "origin"
 
 REPOSITORY_REQUEST_URL = (
     "https://api.gitcode.com/api/v5/repos/openeuler/conda-ecopkgs/pulls"
 )
-ORIGIN_CODE_URL = (
-    "https://gitcode.com/openeuler/conda-ecopkgs.git"
-)
-
-
-class NoFloatLoader(yaml.SafeLoader):
-    pass
+CODE_HOST_URL = "https://gitcode.com"
+ORIGIN_CODE_URL = f"{CODE_HOST_URL}/openeuler/conda-ecopkgs.git"
+# (connect, read) timeout in seconds for API requests
+REQUEST_TIMEOUT = (3.05, 30)
+
+# history depth fetched per side when looking for the merge base of the
+# Pull Request, grown fourfold per attempt up to the max depth
+CHANGE_FETCH_DEPTH = 64
+CHANGE_FETCH_MAX_DEPTH = 4096
+
+
+# Prefer the libyaml C bindings, fall back to the pure-Python loader
+try:
+    from yaml import CSafeLoader as _BaseLoader
+except ImportError:
+    from yaml import SafeLoader as _BaseLoader
+
+# share one keep-alive connection pool between all API requests,
+# transient server errors are retried with backoff by urllib3
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        raise_on_status=False
+    )
+))
 
 
-# Remove recognition of float
-for ch in list(NoFloatLoader.yaml_implicit_resolvers):
-    resolvers = [
-        (tag, regexp)
-        for tag, regexp in NoFloatLoader.yaml_implicit_resolvers[ch]
-        if tag != 'tag:yaml.org,2002:float'
-    ]
-    if resolvers:
-        NoFloatLoader.yaml_implicit_resolvers[ch] = resolvers
-    else:
-        del NoFloatLoader.yaml_implicit_resolvers[ch]
+# lowercase and delete all "." and "-" in a single pass
+_VERSION_FORMAT_TABLE = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    "abcdefghijklmnopqrstuvwxyz",
+    ".-"
+)
 
 
 # transform openEuler version into specifical format
 # e.g., 22.03-lts-sp3 -> oe2203sp3
+@functools.lru_cache(maxsize=None)
 def transform_version_format(os_version: str):
-    lower_version = os_version.lower()
-    # check if os_version has substring "-sp"
-    if "-sp" in lower_version:
-        # delete "lts" in os_version
-        lower_version = lower_version.replace("lts", "")
-    # delete all "." and "-"
-    ret = lower_version.replace(".", "").replace("-", "")
+    ret = os_version.translate(_VERSION_FORMAT_TABLE)
+    # delete "lts" in service pack versions, e.g., 2203ltssp3
+    if "sp" in ret:
+        ret = ret.replace("lts", "")
 
     return f"oe{ret}"
 
 
-def verify_updates(pr_id: int, work_dir: str) -> bool:
+def verify_updates(
+        work_dir: str,
+        max_jobs: int = None,
+        limits: List[str] = None
+) -> bool:
     """
     Verify package updates by processing changed
     supported-versions.yml files and running verify scripts.
 
     Args:
-        pr_id: Pull Request ID to identify changed files
         work_dir: CI working directory path
+        max_jobs: Maximum number of concurrent verify jobs,
+            derived from the machine resources if not set
+        limits: docker run resource options for each verify container
 
     Returns:
         bool: True if package was successfully verified, False otherwise
     """
     try:
-        change_files = get_change_files(pr_id)
+        if not os.path.exists(work_dir):
+            click.echo(click.style(
+                f"Working directory not found - {work_dir}",
+                fg="red"
+            ))
+            return False
+
+        change_files = get_change_files(work_dir)
         if not change_files:
             click.echo(click.style("No changed files found", fg="red"))
             return False
 
         click.echo(click.style(
-            f"Changed files:\n{json.dumps(change_files, indent=2)}",
+            "Changed files:\n" + "\n".join(change_files),
             fg="blue"
         ))
 
-        if os.path.exists(work_dir):
-            os.chdir(work_dir)
-        else:
+        # file named supported-versions.yml and path format is
+        # packages/{name}/supported-versions.yml
+        version_files = [
+            change_file for change_file in change_files
+            if change_file.endswith(SUPPORTED_VERSIONS_SUFFIX)
+            and change_file.count("/") == 2
+        ]
+
+        if not version_files:
             click.echo(click.style(
-                f"Working directory not found - {work_dir}",
+                f"No {SUPPORTED_VERSIONS_FILE} changed, nothing to verify",
+                fg="green"
+            ))
+            return True
+
+        # paths shared by every verify job of this run
+        update_root = os.path.join(work_dir, UPDATE_CODE_DIR)
+        origin_root = os.path.join(work_dir, ORIGIN_CODE_DIR)
+        verify_script = f"{origin_root}/{VERIFY_SCRIPT_FILE}"
+
+        if not os.path.isfile(verify_script):
+            click.echo(click.style(
+                f"Install script not found {verify_script}",
                 fg="red"
             ))
             return False
 
-        # file named supported-versions.yml and path format is
-        # packages/{name}/supported-versions.yml
-        for change_file in change_files:
-            if (not change_file.endswith(SUPPORTED_VERSIONS_FILE)
-                    or len(change_file.split("/")) != 3):
+        # collect the new entries and parse package.yml of the packages
+        # that have some in a single pass, rejecting broken manifests
+        # before any container is started
+        jobs = []
+        package_infos = {}
+        for change_file in version_files:
+            file_jobs = get_verify_jobs(update_root, origin_root, change_file)
+            if not file_jobs:
                 continue
 
-            if verify_change_file(work_dir, change_file):
-                continue
-            else:
+            package = change_file.split("/")[1]
+            package_infos[package] = parse_package_info(
+                update_root, package
+            )
+            if not package_infos[package][0]:
                 click.echo(click.style(
-                    f"Failed to verify versions: {change_file}",
+                    f"Channel not found in {package}/{PACKAGE_FILE}",
                     fg="red"
                 ))
                 return False
-        return True
+            jobs.extend(file_jobs)
+
+        pull_images(jobs)
+
+        return run_verify_jobs(
+            verify_script, package_infos, jobs, max_jobs, limits
+        )
     except Exception as e:
         click.echo(click.style(
             f"Unexpected error: {str(e)}",
@@ -117,97 +225,229 @@ def verify_updates(pr_id: int, work_dir: str) -> bool:
         return False
 
 
-def verify_change_file(work_dir: str, change_file: str) -> bool:
+def pull_images(jobs: List[Tuple[str, str, str]]):
     """
-    Verify the difference between updated and
-    original supported-versions.yml.
+    Pull every conda image needed by the verify jobs once, so that
+    the following docker runs start from a local image.
 
     Args:
-        work_dir: CI working directory path.
+        jobs: (package, os_version, package_version) to be verified.
+    """
+    images = sorted({
+        f"{CONDA_IMAGE_REPO}:{CONDA_IMAGE_VERSION}-"
+        f"{transform_version_format(os_version)}"
+        for _, os_version, _ in jobs
+    })
+    if not images:
+        return
+
+    # a failed pull is not fatal, docker run will retry it
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        executor.map(
+            lambda image: subprocess.run(
+                [*DOCKER_CMD, "pull", image], check=False
+            ),
+            images
+        )
+
+
+def get_verify_jobs(
+        update_root: str, origin_root: str, change_file: str
+) -> List[Tuple[str, str, str]]:
+    """
+    Find the entries of a changed supported-versions.yml that are
+    not in the original one and can be verified on this machine.
+
+    Args:
+        update_root: Path to the updated code checkout.
+        origin_root: Path to the original code checkout.
         change_file: Path to supported-versions.yml.
 
     Returns:
-        True if all new entries are successfully verified,
-        False otherwise.
+        List of (package, os_version, package_version) to be verified.
     """
-    # Load YAML data
-    update_file = os.path.join(
-        work_dir, UPDATE_CODE_DIR, change_file
-    )
-    origin_file = os.path.join(
-        work_dir, ORIGIN_CODE_DIR, change_file
-    )
-    update_data = parse_yaml_data(update_file)
-    origin_data = parse_yaml_data(origin_file)
+    update_file = f"{update_root}/{change_file}"
+    origin_file = f"{origin_root}/{change_file}"
+    origin_entries = set(iter_supported(origin_file))
 
     # only new os/version/arch need be verified
     package = change_file.split("/")[1]
-    for os_version, versions in update_data.items():
-        for package_version, arches in versions.items():
-            for arch in arches:
-                if not need_verify(
-                        origin_data, os_version,
-                        package_version, arch
-                ):
+    jobs = {}  # ordered set of (package, os_version, package_version)
+    for entry in iter_supported(update_file):
+        os_version, package_version, arch = entry
+        if arch not in VERIFY_ARCHES or entry in origin_entries:
+            continue
+        jobs[(package, os_version, package_version)] = None
+    return list(jobs)
+
+
+def run_verify_jobs(
+        verify_script: str,
+        package_infos: Dict[str, Tuple[str, str]],
+        jobs: List[Tuple[str, str, str]],
+        max_jobs: int = None,
+        limits: List[str] = None
+) -> bool:
+    """
+    Run verify jobs concurrently and stop at the first failure.
+
+    Args:
+        verify_script: Path to verify.sh.
+        package_infos: Parsed package.yml by package name.
+        jobs: (package, os_version, package_version) to be verified.
+        max_jobs: Maximum number of concurrent verify jobs.
+        limits: docker run resource options for each verify container.
+
+    Returns:
+        True if all jobs are successfully verified, False otherwise.
+    """
+    if not jobs:
+        return True
+
+    # versions of a package on the same openEuler version share
+    # one container, different packages never do since verify.sh
+    # changes the conda channels of the container
+    groups = {}
+    for package, os_version, package_version in jobs:
+        groups.setdefault((package, os_version), []).append(package_version)
+
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_parallel_jobs(len(groups), max_jobs)
+    ) as executor:
+        futures = {
+            executor.submit(
+                verify_package,
+                verify_script, package_infos[package],
+                package, os_version, package_versions, limits
+            ): package
+            for (package, os_version), package_versions in groups.items()
+        }
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                if future.result():
                     continue
-                if not verify_package(
-                        work_dir, package,
-                        os_version, package_version
-                ):
-                    return False
+                package = futures[future]
+                click.echo(click.style(
+                    f"Failed to verify versions: "
+                    f"packages/{package}/{SUPPORTED_VERSIONS_FILE}",
+                    fg="red"
+                ))
+                return False
+        finally:
+            # queued jobs must not start after a failure or a signal
+            for pending in futures:
+                pending.cancel()
     return True
 
 
-def need_verify(origin_data: dict, os_version: str,
-                package_version: str, os_arch: str) -> bool:
+def max_parallel_jobs(job_count: int, max_jobs: int = None) -> int:
     """
-    Check whether a specific OS arch needs verification.
+    Get the number of verify containers allowed to run at once.
 
     Args:
-        origin_data: Original YAML content.
-        os_version: openEuler version string.
-        package_version: Package version string.
-        os_arch: Architecture to check.
+        job_count: Number of pending verify jobs.
+        max_jobs: Explicit concurrency limit, overrides the
+            machine resource based one.
 
     Returns:
-        True if this arch is new and needs verification, False otherwise.
+        Worker count bounded by CPU count and available memory.
     """
-    app_versions = origin_data.get(os_version, {})
-    origin_arches = app_versions.get(package_version, [])
+    if max_jobs:
+        return max(1, min(max_jobs, job_count))
 
-    # current machine arch or noarch arch need verified
-    machine_arch = platform.machine()
-    if os_arch != machine_arch and os_arch != "noarch":
-        return False
+    limit = os.cpu_count() or 1
+    memory = available_memory()
+    if memory is not None:
+        limit = min(limit, memory // VERIFY_JOB_MEMORY)
+    return max(1, min(limit, job_count))
 
-    # Only verify if the arch is not present in the original list
-    return os_arch not in origin_arches
 
+def available_memory() -> int:
+    """
+    Get the memory in bytes that can be allocated without swapping.
+
+    Returns:
+        MemAvailable from /proc/meminfo, free memory pages when it is
+        not reported, None if neither can be read.
+    """
+    try:
+        with open("/proc/meminfo", 'r') as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    # free memory leaves out reclaimable page cache
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def iter_supported(yaml_file: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    Walk the parser events of a supported-versions.yml and yield its
+    entries without building the whole document.
+
+    Args:
+        yaml_file: Path to supported-versions.yml.
 
-def parse_yaml_data(yaml_file: str) -> Dict[str, Any]:
-    if not os.path.exists(yaml_file):
+    Yields:
+        (os_version, package_version, arch) for every listed arch.
+    """
+    # open directly instead of checking existence first,
+    # a missing file costs no extra stat call this way
+    try:
+        f = open(yaml_file, 'rb')
+    except FileNotFoundError:
         click.echo(click.style(
             f"File not found: {yaml_file}",
             fg="blue"
         ))
-        return {}
+        return
 
-    with open(yaml_file, 'r') as f:
-        data = yaml.load(f, Loader=NoFloatLoader)
-    return data
+    # open collections as [is_mapping, expecting_key],
+    # keys holds the current key of each enclosing mapping
+    stack = []
+    keys = []
+    with f:
+        for event in yaml.parse(f, Loader=_BaseLoader):
+            if isinstance(event, (yaml.MappingEndEvent,
+                                  yaml.SequenceEndEvent)):
+                if stack.pop()[0]:
+                    keys.pop()
+                continue
+            if not isinstance(event, yaml.NodeEvent):
+                continue
 
+            parent = stack[-1] if stack else None
+            if parent and parent[0]:
+                parent[1] = not parent[1]
+                if not parent[1]:
+                    # event is a mapping key
+                    keys[-1] = getattr(event, "value", None)
+                    continue
 
-def parse_package_info(work_dir: str, package: str) -> Tuple[str, str]:
-    package_info_file = os.path.join(
-        work_dir,
-        UPDATE_CODE_DIR,
-        "packages",
-        package,
-        PACKAGE_FILE
-    )
+            if isinstance(event, yaml.ScalarEvent):
+                # os_version -> package_version -> [arch]
+                if (len(stack) == 3 and len(keys) == 2
+                        and not stack[2][0]):
+                    yield keys[0], keys[1], event.value
+            elif isinstance(event, yaml.CollectionStartEvent):
+                is_mapping = isinstance(event, yaml.MappingStartEvent)
+                stack.append([is_mapping, True])
+                if is_mapping:
+                    keys.append(None)
+
+
+def parse_package_info(
+        update_root: str, package: str
+) -> Tuple[str, str]:
+    package_info_file = f"{update_root}/packages/{package}/{PACKAGE_FILE}"
     try:
         with open(package_info_file, 'r') as f:
-            data = yaml.safe_load(f)
+            data = yaml.load(f, Loader=_BaseLoader)
             return data.get("channel"), data.get("dependency-channels")
     except Exception as e:
         click.echo(click.style(
@@ -218,73 +458,47 @@ def parse_package_info(work_dir: str, package: str) -> Tuple[str, str]:
 
 
 def verify_package(
-        work_dir, package, os_version, package_version
+        verify_script, package_info, package, os_version, package_versions,
+        limits=None
 ) -> bool:
     """
-    Find and execute verify.sh in the package directory
+    Execute verify.sh for package versions in a conda container
 
     Args:
-        work_dir: CI working directory path
+        verify_script: path to verify.sh
+        package_info: parsed package.yml of the package
         package: conda package directory
         os_version: os version
-        package_version: package version
+        package_versions: package versions, verified one by one
+        limits: docker run resource options for the container
 
     Returns:
-        True if execution succeeded, False otherwise
+        True if execution succeeded for every version, False otherwise
     """
-    verify_script = os.path.join(
-        work_dir, ORIGIN_CODE_DIR, VERIFY_SCRIPT_FILE
-    )
-
-    if not os.path.isfile(verify_script):
-        click.echo(click.style(
-            f"Install script not found {verify_script}",
-            fg="red"
-        ))
+    if _STOP_VERIFY.is_set():
         return False
 
-    channel, dependencies = parse_package_info(work_dir, package)
-
     os_suffix = transform_version_format(os_version)
-    image_tag = f"{CONDA_IMAGE_VERSION}-{os_suffix}"
+    image = f"{CONDA_IMAGE_REPO}:{CONDA_IMAGE_VERSION}-{os_suffix}"
 
-    docker_cmd = []
     try:
-        docker_cmd = ["sudo", "docker", "run", "--rm", "--privileged",
-                      "-v", f"{verify_script}:{verify_script}",
-                      f"{CONDA_IMAGE_REPO}:{image_tag}",
-                      "bash", "-x", "--", verify_script,
-                      "-p", package,
-                      "-c", channel,
-                      "-v", package_version
-                      ]
-
-        if dependencies:
-            docker_cmd.append("-d")
-            docker_cmd.extend(dependencies)
-
-        click.secho("Running docker command:", fg="blue")
-        click.secho(" ".join(docker_cmd), fg="cyan")
-
-        result = subprocess.run(
-            docker_cmd,
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding='utf-8'
-        )
-
-        click.echo(click.style(
-            f"Successfully executed verify.sh\nOutput: {result.stdout}",
-            fg="green"
-        ))
-        return True
+        timeout = VERIFY_TIMEOUT * len(package_versions)
+        with verify_container(
+                image, verify_script,
+                timeout + VERIFY_CONTAINER_GRACE, limits
+        ) as container:
+            # a signal may have arrived while the container started
+            if _STOP_VERIFY.is_set():
+                return False
+            return exec_verify_script(
+                container, verify_script, package_info,
+                package, os_version, package_versions, timeout
+            )
 
     except subprocess.CalledProcessError as e:
         click.echo(click.style(
-            f"Install script failed (exit {e.returncode})\n"
-            f"Command: {' '.join(docker_cmd)}\n"
+            f"Failed to start container (exit {e.returncode})\n"
+            f"Command: {' '.join(e.cmd)}\n"
             f"Error output: {e.stderr}",
             fg="red"
         ))
@@ -305,11 +519,220 @@ def verify_package(
         return False
 
 
-def pull_source_code(pr_id, source_branch, work_dir):
+@contextlib.contextmanager
+def verify_container(
+        image: str,
+        verify_script: str,
+        lifetime: int,
+        limits: List[str] = None
+):
+    """
+    Start a detached conda container for running verify.sh and
+    remove it once done.
+
+    Args:
+        image: conda image to run.
+        verify_script: path to verify.sh, mounted read-only.
+        lifetime: seconds after which the container exits on its own,
+            bounding a container leaked by a killed process.
+        limits: docker run resource options, e.g. --cpus, unlimited
+            if not set.
+
+    Yields:
+        ID of the running container.
+    """
+    docker_cmd = [*DOCKER_CMD, "run", "-d", "--rm", "--privileged",
+                  "--label", VERIFY_CONTAINER_LABEL,
+                  "-v", f"{verify_script}:{verify_script}:ro"
+                  ]
+
+    if limits:
+        docker_cmd.extend(limits)
+
+    docker_cmd.extend([image, "sleep", str(lifetime)])
+
+    with _OUTPUT_LOCK:
+        click.secho("Running docker command:", fg="blue")
+        click.secho(" ".join(docker_cmd), fg="cyan")
+
+    result = subprocess.run(
+        docker_cmd,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8'
+    )
+    container = result.stdout.strip()
+    with _LIVE_CONTAINERS_LOCK:
+        _LIVE_CONTAINERS.add(container)
+    try:
+        yield container
+    finally:
+        remove_container(container)
+
+
+def remove_container(container: str):
+    """
+    Force remove a verify container, ignoring failures.
+
+    Args:
+        container: ID of the container to remove.
+    """
+    subprocess.run(
+        [*DOCKER_CMD, "rm", "-f", container],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=False
+    )
+    with _LIVE_CONTAINERS_LOCK:
+        _LIVE_CONTAINERS.discard(container)
+
+
+def remove_live_containers(signum, frame):
+    """
+    Signal handler stopping the verification: no further container is
+    started, and every running one is removed before exiting so its
+    docker exec client returns and the verify threads can finish.
+    """
+    _STOP_VERIFY.set()
+    with _LIVE_CONTAINERS_LOCK:
+        containers = list(_LIVE_CONTAINERS)
+    for container in containers:
+        remove_container(container)
+    sys.exit(128 + signum)
+
+
+def exec_verify_script(
+        container, verify_script, package_info,
+        package, os_version, package_versions, timeout
+) -> bool:
+    """
+    Execute verify.sh for package versions in a running container,
+    looping over the versions inside a single docker exec
+
+    Args:
+        container: ID of the container started by verify_container
+        verify_script: path to verify.sh
+        package_info: parsed package.yml of the package
+        package: conda package directory
+        os_version: os version
+        package_versions: package versions, verified one by one
+        timeout: wall clock limit in seconds for the whole docker exec
+
+    Returns:
+        True if execution succeeded for every version, False otherwise
+    """
+    channel, dependencies = package_info
+    verify_cmd = shlex.join([
+        "bash", "-x", "--", verify_script,
+        "-p", package,
+        "-c", channel
+    ]) + ' -v "$version"'
+
+    if dependencies:
+        verify_cmd += " " + shlex.join(["-d", *dependencies])
+
+    # the loop runs from "bash -c" rather than stdin, so commands of
+    # verify.sh reading stdin cannot consume the rest of the script
+    versions = " ".join(map(shlex.quote, package_versions))
+    script = (
+        f"for version in {versions}; do"
+        f' echo "{VERIFY_VERSION_MARKER}$version";'
+        f" {verify_cmd} || exit $?;"
+        f" done"
+    )
+    docker_cmd = [*DOCKER_CMD, "exec", container, "bash", "-c", script]
+
+    with _OUTPUT_LOCK:
+        click.secho("Running docker command:", fg="blue")
+        click.secho(" ".join(docker_cmd), fg="cyan")
+
+    # stream the container output as it comes and only keep
+    # the tail of it for the failure report
+    output_tail = collections.deque(maxlen=VERIFY_OUTPUT_TAIL)
+    os_suffix = transform_version_format(os_version)
+    package_version = None
+    with subprocess.Popen(
+            docker_cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1
+    ) as proc:
+        # a hung verify.sh must not wedge the CI job
+        timed_out = threading.Event()
+        timer = threading.Timer(
+            timeout,
+            lambda: (timed_out.set(), proc.kill())
+        )
+        timer.start()
+        try:
+            for line in proc.stdout:
+                if line.startswith(VERIFY_VERSION_MARKER):
+                    if package_version is not None:
+                        _echo_verified(package, package_version, os_version)
+                    package_version = line[len(VERIFY_VERSION_MARKER):]
+                    package_version = package_version.strip()
+                    output_tail.clear()
+                    continue
+                output_tail.append(line)
+                with _OUTPUT_LOCK:
+                    # stdout is a pipe in CI, flush for live progress
+                    sys.stdout.write(
+                        f"[{os_suffix}/{package}={package_version}] {line}"
+                    )
+                    sys.stdout.flush()
+            returncode = proc.wait()
+        finally:
+            timer.cancel()
+
+    if returncode != 0:
+        reason = (
+            "timed out" if timed_out.is_set() else f"exit {returncode}"
+        )
+        with _OUTPUT_LOCK:
+            click.echo(click.style(
+                f"Install script failed for {package}={package_version}"
+                f" ({reason})\n"
+                f"Command: {' '.join(docker_cmd)}\n"
+                f"Error output: {''.join(output_tail)}",
+                fg="red"
+            ))
+        return False
+
+    if package_version is not None:
+        _echo_verified(package, package_version, os_version)
+    return True
+
+
+def _echo_verified(package, package_version, os_version):
+    with _OUTPUT_LOCK:
+        click.echo(click.style(
+            f"Successfully executed verify.sh: "
+            f"{package}={package_version} on {os_version}",
+            fg="green"
+        ))
+
+
+def pull_source_code(pr_id, source_repo, source_branch, work_dir):
     os.makedirs(f"{work_dir}/{UPDATE_CODE_DIR}", exist_ok=True)
-    source_code_url = get_source_code(pr_id=pr_id)
-    command = ['git', 'clone', '-b',
-               source_branch,
+    # "owner/repo" already identifies the fork, only ask the API otherwise
+    if "/" in source_repo:
+        source_code_url = f"{CODE_HOST_URL}/{source_repo}.git"
+    else:
+        try:
+            source_code_url = get_source_code(pr_id=pr_id)
+        except RuntimeError as e:
+            click.echo(click.style(
+                f"Failed to get source code url: {str(e)}",
+                fg="red"
+            ))
+            return 1
+    command = ['git', 'clone', '--depth=1', '--single-branch',
+               '-b', source_branch,
                source_code_url,
                f"{work_dir}/{UPDATE_CODE_DIR}"
                ]
@@ -324,7 +747,8 @@ def pull_source_code(pr_id, source_branch, work_dir):
 
 def pull_origin_code(work_dir):
     os.makedirs(f"{work_dir}/{ORIGIN_CODE_DIR}", exist_ok=True)
-    command = ['git', 'clone', ORIGIN_CODE_URL,
+    command = ['git', 'clone', '--depth=1', '--single-branch',
+               ORIGIN_CODE_URL,
                f"{work_dir}/{ORIGIN_CODE_DIR}"
                ]
     if subprocess.call(command) != 0:
@@ -337,39 +761,84 @@ def pull_origin_code(work_dir):
 
 
 def _request(url: str, headers: dict = None):
-    cnt = 0
-    response = None
-    while (not response) and (cnt < 20):
-        response = requests.get(url=url, headers=headers)
-        cnt += 1
-    return response
+    return _SESSION.get(url=url, headers=headers, timeout=REQUEST_TIMEOUT)
 
 
-def get_change_files(pr_id) -> List[str]:
-    change_files = []
-    url = f"{REPOSITORY_REQUEST_URL}/{pr_id}/files"
-    headers = {"private-token": os.environ["GITCODE_API_TOKEN"]}
-    response = _request(url=url, headers=headers)
-    # check status code
-    if response.status_code == 200:
-        files = response.json()
-        for file in files:
-            change_files.append(file['filename'])
-    else:
+def get_change_files(work_dir: str) -> List[str]:
+    """
+    List the files changed by the Pull Request by diffing the update
+    checkout against its merge base with the tip of the origin repository.
+
+    Both clones are shallow, so the history of both tips is fetched into
+    the update checkout with a growing depth until the merge base shows
+    up. Files changed only on the origin branch are not listed.
+
+    Args:
+        work_dir: CI working directory path.
+
+    Returns:
+        Changed file paths, empty if they cannot be computed.
+    """
+    update_dir = os.path.join(work_dir, UPDATE_CODE_DIR)
+    merge_base_cmd = ['git', '-C', update_dir, 'merge-base',
+                      'FETCH_HEAD', 'HEAD']
+    diff_cmd = ['git', '-C', update_dir, 'diff', '--name-only',
+                'FETCH_HEAD...HEAD']
+    depth = CHANGE_FETCH_DEPTH
+    try:
+        while True:
+            # the origin tip is fetched last so FETCH_HEAD points to it
+            subprocess.run(
+                ['git', '-C', update_dir, 'fetch', f'--depth={depth}',
+                 'origin'],
+                check=True
+            )
+            subprocess.run(
+                ['git', '-C', update_dir, 'fetch', f'--depth={depth}',
+                 ORIGIN_CODE_URL, 'HEAD'],
+                check=True
+            )
+            if subprocess.run(
+                    merge_base_cmd,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL
+            ).returncode == 0:
+                break
+            if depth >= CHANGE_FETCH_MAX_DEPTH:
+                click.echo(click.style(
+                    f"No merge base with {ORIGIN_CODE_URL} "
+                    f"within {depth} commits",
+                    fg="red"
+                ))
+                return []
+            depth *= 4
+
+        output = subprocess.run(
+            diff_cmd,
+            check=True,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        ).stdout
+    except subprocess.CalledProcessError as e:
         click.echo(click.style(
-            f"Failed to fetch files: {response.status_code}",
+            f"Failed to fetch files: {' '.join(e.cmd)}"
+            f" (exit {e.returncode})",
             fg="red"
         ))
         return []
-    return change_files
+    return output.splitlines()
 
 
 def get_source_code(pr_id) -> str:
     url = f"{REPOSITORY_REQUEST_URL}/{pr_id}"
     headers = {"private-token": os.environ["GITCODE_API_TOKEN"]}
-    response = _request(url=url, headers=headers)
+    try:
+        response = _request(url=url, headers=headers)
+    except requests.RequestException as e:
+        raise RuntimeError(f"Request failed: {str(e)}, url: {url}") from e
     if response.status_code != 200:
-        raise RuntimeError(f"Request failed with status code:",
+        raise RuntimeError(f"Request failed with status code: "
                            f"{response.status_code}, url: {url}")
 
     # Get the user repository info
@@ -400,6 +869,19 @@ def init_parser():
     new_parser.add_argument(
         "-br", "--source_branch", help="source branch of the PR"
     )
+    new_parser.add_argument(
+        "-j", "--jobs", type=int,
+        help="number of concurrent verify containers"
+    )
+    new_parser.add_argument(
+        "--cpus",
+        help="CPU limit of each verify container, unlimited by default"
+    )
+    new_parser.add_argument(
+        "--memory",
+        help="memory limit of each verify container, e.g. 4g, "
+             "unlimited by default"
+    )
     return new_parser
 
 
@@ -421,22 +903,37 @@ if __name__ == "__main__":
         parser.print_help()
         sys.exit(1)
 
+    # containers run detached, remove them when the CI job is cancelled
+    signal.signal(signal.SIGTERM, remove_live_containers)
+    signal.signal(signal.SIGINT, remove_live_containers)
+
     # create workdir
     work_dir = os.path.join(DEFAULT_WORKDIR, args.source_repo)
     if os.path.exists(work_dir):
         shutil.rmtree(work_dir)
 
-    if pull_source_code(
-            args.prid,
-            args.source_branch,
-            work_dir
-    ):
-        sys.exit(1)
-
-    if pull_origin_code(work_dir):
-        sys.exit(1)
-
-    if not verify_updates(args.prid, work_dir):
+    # both clones are independent, fetch them concurrently
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        clone_jobs = [
+            executor.submit(
+                pull_source_code,
+                args.prid,
+                args.source_repo,
+                args.source_branch,
+                work_dir
+            ),
+            executor.submit(pull_origin_code, work_dir),
+        ]
+        if any(job.result() for job in clone_jobs):
+            sys.exit(1)
+
+    limits = []
+    if args.cpus:
+        limits.append(f"--cpus={args.cpus}")
+    if args.memory:
+        limits.append(f"--memory={args.memory}")
+
+    if not verify_updates(work_dir, args.jobs, limits):
         sys.exit(1)
 
     clear_all(work_dir)
\ No newline at end of file